@@ -8,6 +8,9 @@ import time
 import re
 import json
 
+from .egress import EgressPool, EgressRoute
+from .tracing import trace_configs, run_all_traced, format_trace
+
 class InstagramImages(commands.Cog):
     """Pull latest images from an Instagram account."""
 
@@ -16,12 +19,31 @@ class InstagramImages(commands.Cog):
         self.config = Config.get_conf(self, identifier=1234567892)
         default_guild = {"instagram_username": None, "cached_images": []}
         self.config.register_guild(**default_guild)
+        self.config.register_global(egress_routes=[])
         
         self.logger = logging.getLogger('red.InstagramImages')
         self.last_run_time = None
+        self.egress_pool = EgressPool()
         
         self.scrape_task = self.bot.loop.create_task(self.scrape_loop())
 
+    async def cog_load(self):
+        self.egress_pool.set_routes(await self.config.egress_routes())
+
+    def _session(self, route, url):
+        """Open a client session over the egress route picked for url, traced when run under the debug command"""
+        return aiohttp.ClientSession(
+            connector=route.connector(),
+            trace_configs=trace_configs() + [self.egress_pool.trace_config(route, url)],
+        )
+
+    def _methods(self):
+        return [
+            ("Instagram API", self.fetch_images_instagram_api),
+            ("Instagram Scraper", self.fetch_images_instagram_scraper),
+            ("Instagram RSS", self.fetch_images_instagram_rss),
+        ]
+
     async def fetch_images_instagram_api(self, username: str, count: int = 20):
         """Try to use Instagram's public data"""
         try:
@@ -31,8 +53,9 @@ class InstagramImages(commands.Cog):
                 'X-IG-App-ID': '936619743392459'
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers, timeout=10) as response:
+            route = self.egress_pool.pick(url)
+            async with self._session(route, url) as session:
+                async with session.get(url, headers=headers, timeout=10, proxy=route.proxy) as response:
                     if response.status == 200:
                         data = await response.json()
                         images = []
@@ -66,8 +89,9 @@ class InstagramImages(commands.Cog):
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers, timeout=15) as response:
+            route = self.egress_pool.pick(url)
+            async with self._session(route, url) as session:
+                async with session.get(url, headers=headers, timeout=15, proxy=route.proxy) as response:
                     if response.status == 200:
                         html = await response.text()
                         
@@ -112,8 +136,9 @@ class InstagramImages(commands.Cog):
                     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
                 }
                 
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(service_url, headers=headers, timeout=10) as response:
+                route = self.egress_pool.pick(service_url)
+                async with self._session(route, service_url) as session:
+                    async with session.get(service_url, headers=headers, timeout=10, proxy=route.proxy) as response:
                         if response.status == 200:
                             text = await response.text()
                             image_urls = re.findall(r'<img[^>]*src="([^"]+)"', text)
@@ -133,11 +158,7 @@ class InstagramImages(commands.Cog):
         
         username = username.lstrip('@')
         
-        methods = [
-            ("Instagram API", self.fetch_images_instagram_api),
-            ("Instagram Scraper", self.fetch_images_instagram_scraper),
-            ("Instagram RSS", self.fetch_images_instagram_rss),
-        ]
+        methods = self._methods()
         
         for method_name, method_func in methods:
             try:
@@ -148,8 +169,6 @@ class InstagramImages(commands.Cog):
                     return images
             except Exception as e:
                 self.logger.warning(f"Method {method_name} failed: {str(e)}")
-            
-            await asyncio.sleep(1)
         
         self.logger.error(f"All methods failed for {username}")
         return []
@@ -183,6 +202,45 @@ class InstagramImages(commands.Cog):
             self.logger.error(f"Error in immediate fetch: {str(e)}")
             await ctx.send("❌ Error fetching images.")
 
+    @instaset.group()
+    @commands.is_owner()
+    async def egress(self, ctx):
+        """Egress routes (local bind addresses or HTTP proxies) that fetches are spread across."""
+        pass
+
+    @egress.command(name="add")
+    async def egress_add(self, ctx, route: str):
+        """Add a local source IP (e.g. `192.0.2.10`) or proxy URL (e.g. `http://127.0.0.1:8080`)."""
+        try:
+            EgressRoute(route)
+        except ValueError:
+            return await ctx.send("❌ Route must be an IP address or an `http://` / `https://` proxy URL.")
+        
+        async with self.config.egress_routes() as routes:
+            if route in routes:
+                return await ctx.send(f"`{route}` is already in the egress pool.")
+            routes.append(route)
+            self.egress_pool.set_routes(routes)
+        await ctx.send(f"✅ Added `{route}` to the egress pool.")
+        self.logger.info(f"Egress route {route} added")
+
+    @egress.command(name="remove")
+    async def egress_remove(self, ctx, route: str):
+        """Remove a route from the egress pool."""
+        async with self.config.egress_routes() as routes:
+            if route not in routes:
+                return await ctx.send(f"❌ `{route}` is not in the egress pool.")
+            routes.remove(route)
+            self.egress_pool.set_routes(routes)
+        await ctx.send(f"✅ Removed `{route}` from the egress pool.")
+        self.logger.info(f"Egress route {route} removed")
+
+    @egress.command(name="list")
+    async def egress_list(self, ctx):
+        """Show egress routes and their health since the cog loaded."""
+        embed = discord.Embed(title="Egress Routes", description="\n".join(self.egress_pool.status_lines()), color=0xE1306C)
+        await ctx.send(embed=embed)
+
     @commands.command(name="scran")
     async def scran(self, ctx):
         """Get a random image from the cached Instagram posts"""
@@ -212,6 +270,20 @@ class InstagramImages(commands.Cog):
         await ctx.send(embed=embed)
         self.logger.debug(f"Sent random image from cache in guild {ctx.guild.id}")
 
+    async def refresh_guild(self, guild, username: str, limit: asyncio.Semaphore):
+        """Refresh one guild's cache, returning how many images were cached."""
+        async with limit:
+            try:
+                self.logger.debug(f"Scraping Instagram images for {username} in guild {guild.id}")
+                imgs = await self.fetch_images(username, 20)
+                if imgs:
+                    await self.config.guild(guild).cached_images.set(imgs)
+                    self.logger.info(f"Cached {len(imgs)} Instagram images for {username} in guild {guild.id}")
+                    return len(imgs)
+            except Exception as e:
+                self.logger.error(f"Error scraping Instagram for {username} in guild {guild.id}: {str(e)}")
+        return 0
+
     async def scrape_loop(self):
         await self.bot.wait_until_ready()
         self.logger.info("InstagramImages scraper loop started")
@@ -223,21 +295,19 @@ class InstagramImages(commands.Cog):
             guilds_processed = 0
             images_cached = 0
 
+            # Keep one account in flight per egress route, so adding routes
+            # adds refresh capacity rather than just rotating addresses
+            limit = asyncio.Semaphore(len(self.egress_pool.routes))
+            refreshes = []
             for guild in self.bot.guilds:
                 username = await self.config.guild(guild).instagram_username()
-                if not username:
-                    continue
-                    
-                try:
-                    self.logger.debug(f"Scraping Instagram images for {username} in guild {guild.id}")
-                    imgs = await self.fetch_images(username, 20)
-                    if imgs:
-                        await self.config.guild(guild).cached_images.set(imgs)
-                        guilds_processed += 1
-                        images_cached += len(imgs)
-                        self.logger.info(f"Cached {len(imgs)} Instagram images for {username} in guild {guild.id}")
-                except Exception as e:
-                    self.logger.error(f"Error scraping Instagram for {username} in guild {guild.id}: {str(e)}")
+                if username:
+                    refreshes.append(self.refresh_guild(guild, username, limit))
+            
+            for result in await asyncio.gather(*refreshes):
+                if result:
+                    guilds_processed += 1
+                    images_cached += result
             
             self.last_run_time = time.time()
             cycle_duration = self.last_run_time - start_time
@@ -275,6 +345,27 @@ class InstagramImages(commands.Cog):
             self.logger.error(f"Error in insta_force: {str(e)}")
             await ctx.send("❌ Error fetching images.")
 
+    @commands.command()
+    @commands.admin_or_permissions(manage_guild=True)
+    async def insta_debug(self, ctx):
+        """Debug Instagram connection methods."""
+        username = await self.config.guild(ctx.guild).instagram_username()
+        if not username:
+            return await ctx.send("❌ No Instagram username set.")
+        
+        await ctx.send(f"🔍 Testing ALL Instagram methods for `{username}` concurrently...")
+        
+        async with ctx.typing():
+            traces = await run_all_traced(self._methods(), username, 5)
+        
+        embed = discord.Embed(title="📸 Instagram Debug Results", description=f"@{username}", color=0xE1306C)
+        for trace in traces:
+            name, value = format_trace(trace)
+            embed.add_field(name=name, value=value, inline=False)
+        embed.set_footer(text="dns · conn (incl. TLS) · ttfb · body per request; parse is time outside requests")
+        
+        await ctx.send(embed=embed)
+
     @commands.command()
     async def insta_status(self, ctx):
         """Check current Instagram image status."""
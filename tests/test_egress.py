@@ -0,0 +1,258 @@
+import asyncio
+import importlib.util
+import pathlib
+import time
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+
+
+def load_egress(package):
+    # Loaded by path: the cog packages' __init__ pulls in redbot
+    spec = importlib.util.spec_from_file_location(f"{package}_egress", ROOT / package / "egress.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(params=["twitterimages", "instaimages"])
+def egress(request):
+    return load_egress(request.param)
+
+
+def test_copies_match():
+    assert (ROOT / "twitterimages" / "egress.py").read_text() == (ROOT / "instaimages" / "egress.py").read_text()
+
+
+class StandInProxy:
+    """A local HTTP proxy stand-in that answers every request itself."""
+
+    def __init__(self, status=200, retry_after=None):
+        self.status = status
+        self.retry_after = retry_after
+        self.hits = []
+
+    async def handle(self, request):
+        self.hits.append(request.host)
+        headers = {"Retry-After": self.retry_after} if self.retry_after else {}
+        return web.Response(status=self.status, headers=headers, text="ok")
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_route("*", "/{tail:.*}", self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+
+async def fetch(pool, url):
+    """Fetch url the way the cogs do and return the label of the route used."""
+    route = pool.pick(url)
+    async with aiohttp.ClientSession(connector=route.connector(), trace_configs=[pool.trace_config(route, url)]) as session:
+        try:
+            async with session.get(url, proxy=route.proxy, timeout=aiohttp.ClientTimeout(total=5)) as response:
+                await response.read()
+        except aiohttp.ClientError:
+            pass
+    return route.label
+
+
+def run_with_proxies(proxies, scenario):
+    async def main():
+        for proxy in proxies:
+            await proxy.start()
+        try:
+            await scenario()
+        finally:
+            for proxy in proxies:
+                await proxy.stop()
+
+    asyncio.run(main())
+
+
+def test_round_robin_skips_rate_limited_route(egress):
+    a, b, c = StandInProxy(), StandInProxy(status=429, retry_after="30"), StandInProxy()
+
+    async def scenario():
+        pool = egress.EgressPool([a.url, b.url, c.url])
+        used = [await fetch(pool, "http://one.test/") for _ in range(5)]
+        # b answered 429 on its turn and sits out the rest of the rotation
+        assert used == [a.url, b.url, c.url, a.url, c.url]
+        assert b.hits == ["one.test"]
+
+        # Cooldowns and rotation are per host, so another host still gets b
+        used = [await fetch(pool, "http://two.test/") for _ in range(2)]
+        assert used == [a.url, b.url]
+
+        route_b = pool.routes[1]
+        assert route_b.rate_limited == 2
+        assert not route_b.available("one.test", time.monotonic())
+
+    run_with_proxies([a, b, c], scenario)
+
+
+def test_all_resting_keeps_rotating(egress):
+    a, b, c = (StandInProxy(status=429, retry_after=retry_after) for retry_after in ("60", "10", "30"))
+
+    async def scenario():
+        pool = egress.EgressPool([a.url, b.url, c.url])
+        assert [await fetch(pool, "http://one.test/") for _ in range(3)] == [a.url, b.url, c.url]
+        # Every route is resting for one.test; load still spreads across them
+        used = [await fetch(pool, "http://one.test/") for _ in range(6)]
+        assert used == [a.url, b.url, c.url] * 2
+        assert len(a.hits) == len(b.hits) == len(c.hits) == 3
+
+    run_with_proxies([a, b, c], scenario)
+
+
+def test_all_resting_skips_routes_that_are_down(egress):
+    a, b = StandInProxy(status=429, retry_after="60"), StandInProxy()
+
+    async def scenario():
+        pool = egress.EgressPool([a.url, b.url])
+        await fetch(pool, "http://one.test/")
+        pool.routes[0].cooldowns["one.test"] = time.monotonic() + 60
+        pool.routes[1].down_until = time.monotonic() + 60
+        assert [pool.pick("http://one.test/").label for _ in range(3)] == [a.url] * 3
+
+    run_with_proxies([a, b], scenario)
+
+
+def test_set_routes_keeps_health_for_remaining_routes(egress):
+    a, b = StandInProxy(), StandInProxy(status=429, retry_after="30")
+
+    async def scenario():
+        pool = egress.EgressPool([a.url, b.url])
+        await fetch(pool, "http://one.test/")
+        await fetch(pool, "http://one.test/")
+        route_b = pool.routes[1]
+
+        pool.set_routes([b.url, "127.0.0.1"])
+        assert pool.routes[0] is route_b
+        assert route_b.rate_limited == 1
+        assert "one.test" in route_b.cooldowns
+        assert pool.routes[1].successes == 0
+        assert pool.pick("http://one.test/").label == "127.0.0.1"
+
+    run_with_proxies([a, b], scenario)
+
+
+def test_unreachable_proxy_is_taken_down(egress):
+    a = StandInProxy()
+
+    async def scenario():
+        # Reserve a port and release it so nothing is listening there
+        dead = StandInProxy()
+        await dead.start()
+        await dead.stop()
+
+        pool = egress.EgressPool([dead.url, a.url])
+        assert await fetch(pool, "http://one.test/") == dead.url
+        assert pool.routes[0].failures == 1
+        # Down for every host, not just the one that failed
+        assert [await fetch(pool, "http://two.test/") for _ in range(3)] == [a.url] * 3
+
+    run_with_proxies([a], scenario)
+
+
+def test_non_429_client_error_keeps_cooldown(egress):
+    pool = egress.EgressPool(["127.0.0.1"])
+    route = pool.routes[0]
+    pool.record(route, "one.test", 429, "30")
+    pool.record(route, "one.test", 403)
+    assert route.successes == 0
+    assert route.failures == 1
+    assert "one.test" in route.cooldowns
+
+
+def test_repeated_server_errors_rest_route_for_that_host(egress):
+    pool = egress.EgressPool(["127.0.0.1", "127.0.0.2"])
+    route = pool.routes[0]
+    for _ in range(egress.FAILURE_THRESHOLD - 1):
+        pool.record(route, "one.test", 502)
+    assert "one.test" not in route.cooldowns
+    pool.record(route, "one.test", 502)
+    assert not route.available("one.test", time.monotonic())
+    assert route.down_until == 0
+    assert [pool.pick("http://one.test/").label for _ in range(2)] == ["127.0.0.2"] * 2
+    assert [pool.pick("http://other.test/").label for _ in range(2)] == ["127.0.0.1", "127.0.0.2"]
+
+
+def test_strikes_are_per_host(egress):
+    pool = egress.EgressPool(["127.0.0.1"])
+    route = pool.routes[0]
+    for host in ("one.test", "two.test", "three.test"):
+        pool.record(route, host, 500)
+    assert route.cooldowns == {}
+
+
+def test_dead_target_does_not_take_bind_routes_down(egress):
+    healthy = StandInProxy()
+    sources = []
+
+    async def record_source(request):
+        sources.append(request.remote)
+        return web.Response(text="ok")
+
+    healthy.handle = record_source
+
+    async def scenario():
+        # Reserve a port and release it so the target refuses connections
+        dead = StandInProxy()
+        await dead.start()
+        await dead.stop()
+        dead_url = dead.url.replace("127.0.0.1", "127.0.0.9") + "/"
+
+        pool = egress.EgressPool(["127.0.0.1", "127.0.0.2", "127.0.0.3"])
+        for _ in range(3 * egress.FAILURE_THRESHOLD):
+            await fetch(pool, dead_url)
+        assert all(route.down_until == 0 for route in pool.routes)
+        assert all(not route.available("127.0.0.9", time.monotonic()) for route in pool.routes)
+
+        used = [await fetch(pool, healthy.url + "/") for _ in range(4)]
+        assert used == ["127.0.0.1", "127.0.0.2", "127.0.0.3", "127.0.0.1"]
+        assert sources == ["127.0.0.1", "127.0.0.2", "127.0.0.3", "127.0.0.1"]
+
+    run_with_proxies([healthy], scenario)
+
+
+def test_unusable_bind_address_is_taken_down(egress):
+    healthy = StandInProxy()
+
+    async def scenario():
+        # TEST-NET-1, never assigned to a local interface
+        pool = egress.EgressPool(["192.0.2.1", "127.0.0.1"])
+        assert await fetch(pool, healthy.url + "/") == "192.0.2.1"
+        assert pool.routes[0].down_until > 0
+        assert [await fetch(pool, healthy.url + "/") for _ in range(2)] == ["127.0.0.1"] * 2
+
+    run_with_proxies([healthy], scenario)
+
+
+def test_redirected_429_rests_the_picked_host(egress):
+    a, b = StandInProxy(status=429, retry_after="30"), StandInProxy()
+
+    async def redirect_then_limit(request):
+        if request.host == "one.test":
+            raise web.HTTPFound("http://two.test/")
+        return web.Response(status=429, headers={"Retry-After": "30"})
+
+    a.handle = redirect_then_limit
+
+    async def scenario():
+        pool = egress.EgressPool([a.url, b.url])
+        await fetch(pool, "http://one.test/")
+        assert "one.test" in pool.routes[0].cooldowns
+        assert "two.test" not in pool.routes[0].cooldowns
+        assert [await fetch(pool, "http://one.test/") for _ in range(2)] == [b.url, b.url]
+
+    run_with_proxies([a, b], scenario)
@@ -0,0 +1,171 @@
+import aiohttp
+import errno
+import ipaddress
+import itertools
+import time
+from urllib.parse import urlsplit
+
+# How long a route sits out for a host after a 429 without a usable Retry-After
+DEFAULT_COOLDOWN = 300
+# How long a route sits out after its proxy or bind address fails (for every
+# host), or after FAILURE_THRESHOLD errors in a row from one host (for that host)
+FAILURE_COOLDOWN = 60
+FAILURE_THRESHOLD = 3
+
+
+def _host(url: str):
+    return urlsplit(url).hostname
+
+
+class EgressRoute:
+    """One way out: the default interface, a local bind address or an HTTP proxy."""
+
+    def __init__(self, spec: str = None):
+        self.spec = spec
+        self.proxy = None
+        self.local_addr = None
+        if spec is None:
+            pass
+        elif spec.startswith(("http://", "https://")):
+            self.proxy = spec
+        else:
+            # Raises ValueError for anything that is neither a proxy nor an IP
+            self.local_addr = str(ipaddress.ip_address(spec))
+
+        self.cooldowns = {}  # host -> time.monotonic() the route is usable again
+        self.down_until = 0  # same, but for every host
+        self.strikes = {}  # host -> server errors in a row
+        self.successes = 0
+        self.rate_limited = 0
+        self.failures = 0
+
+    @property
+    def label(self):
+        return self.spec or "default"
+
+    def ready_at(self, host: str):
+        return max(self.down_until, self.cooldowns.get(host, 0))
+
+    def available(self, host: str, now: float):
+        return self.ready_at(host) <= now
+
+    def connector(self):
+        """A connector bound to this route's source address, or None for the default."""
+        if self.local_addr is None:
+            return None
+        return aiohttp.TCPConnector(local_addr=(self.local_addr, 0))
+
+
+class EgressPool:
+    """Spread each host's requests across routes, resting ones that are rate limited or failing."""
+
+    def __init__(self, specs=(), cooldown: int = DEFAULT_COOLDOWN, failure_cooldown: int = FAILURE_COOLDOWN):
+        self.cooldown = cooldown
+        self.failure_cooldown = failure_cooldown
+        self.routes = []
+        self._cursors = {}
+        self.set_routes(specs)
+
+    def set_routes(self, specs):
+        """Replace the configured routes, keeping health for ones that stay."""
+        existing = {route.spec: route for route in self.routes}
+        routes = [existing.get(spec) or EgressRoute(spec) for spec in specs]
+        self.routes = routes or [EgressRoute()]
+        self._cursors = {}
+
+    def pick(self, url: str):
+        """Next route for url's host in round-robin order, skipping ones cooling down.
+
+        If every route is cooling down for the host, rotation carries on over
+        the routes that are only resting for this host, then over all of them,
+        so requests still go out spread across addresses rather than piling
+        onto one of them.
+        """
+        host = _host(url)
+        now = time.monotonic()
+        cursor = self._cursors.setdefault(host, itertools.count())
+        start = next(cursor)
+        rotation = [self.routes[(start + offset) % len(self.routes)] for offset in range(len(self.routes))]
+        for route in rotation:
+            if route.available(host, now):
+                return route
+        for route in rotation:
+            if route.down_until <= now:
+                return route
+        return rotation[0]
+
+    def record(self, route: EgressRoute, host: str, status: int, retry_after: str = None):
+        if status == 429:
+            route.rate_limited += 1
+            delay = self.cooldown
+            if retry_after and retry_after.isdigit():
+                delay = int(retry_after)
+            route.cooldowns[host] = time.monotonic() + delay
+        elif status >= 500:
+            route.failures += 1
+            self.strike(route, host)
+        elif status >= 400:
+            # Blocks like a 403 say nothing good about the route; count them
+            # but leave any cooldown in place
+            route.failures += 1
+        else:
+            route.successes += 1
+            route.strikes.pop(host, None)
+            route.cooldowns.pop(host, None)
+
+    def record_error(self, route: EgressRoute, host: str, exception: Exception):
+        route.failures += 1
+        if self.is_route_fault(route, exception):
+            # Dead proxy or unusable bind address, nothing will get through
+            route.down_until = time.monotonic() + self.failure_cooldown
+        else:
+            # Unreachable targets, DNS failures and timeouts are the host's
+            # problem, so only that host stops using the route
+            self.strike(route, host)
+
+    def is_route_fault(self, route: EgressRoute, exception: Exception):
+        if isinstance(exception, aiohttp.ClientProxyConnectionError):
+            return True
+        if route.local_addr is not None and isinstance(exception, aiohttp.ClientConnectorError):
+            return exception.os_error.errno in (errno.EADDRNOTAVAIL, errno.EADDRINUSE)
+        return False
+
+    def strike(self, route: EgressRoute, host: str):
+        route.strikes[host] = route.strikes.get(host, 0) + 1
+        if route.strikes[host] >= FAILURE_THRESHOLD:
+            route.strikes.pop(host)
+            route.cooldowns[host] = max(route.cooldowns.get(host, 0), time.monotonic() + self.failure_cooldown)
+
+    def trace_config(self, route: EgressRoute, url: str):
+        """TraceConfig that feeds response statuses back into route's health.
+
+        Outcomes are recorded against url's host, the one pick() chose the route
+        for, even if the request was redirected elsewhere.
+        """
+        host = _host(url)
+        config = aiohttp.TraceConfig()
+
+        async def on_request_end(session, ctx, params):
+            response = params.response
+            self.record(route, host, response.status, response.headers.get("Retry-After"))
+
+        async def on_request_exception(session, ctx, params):
+            self.record_error(route, host, params.exception)
+
+        config.on_request_end.append(on_request_end)
+        config.on_request_exception.append(on_request_exception)
+        config.freeze()
+        return config
+
+    def status_lines(self):
+        now = time.monotonic()
+        lines = []
+        for route in self.routes:
+            line = f"`{route.label}` ✅ {route.successes} · 429 {route.rate_limited} · ❌ {route.failures}"
+            if route.down_until > now:
+                line += f" · down for {route.down_until - now:.0f}s"
+            resting = [host for host in route.cooldowns if route.cooldowns[host] > now]
+            if resting:
+                line += f" · resting for {', '.join(resting)}"
+            lines.append(line)
+        return lines
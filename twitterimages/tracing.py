@@ -0,0 +1,198 @@
+import aiohttp
+import asyncio
+import contextvars
+import time
+from yarl import URL
+
+# Set while a strategy runs under the debug command; sessions opened in that
+# context pick up a TraceConfig that records into it.
+current_trace = contextvars.ContextVar("current_trace", default=None)
+
+
+class RequestTiming:
+    """Phase timestamps for a single HTTP request."""
+
+    def __init__(self, method: str, url):
+        self.method = method
+        self.host = url.host
+        self.status = None
+        self.error = None
+        self.bytes = 0
+        self.start = time.perf_counter()
+        self.dns_start = None
+        self.dns_end = None
+        self.connect_start = None
+        self.connect_end = None
+        self.response_start = None
+        self.last_chunk = None
+        self.end = None
+
+    @property
+    def dns(self):
+        if self.dns_start is None or self.dns_end is None:
+            return None
+        return self.dns_end - self.dns_start
+
+    @property
+    def connect(self):
+        # Connection creation wraps host resolution, so DNS is subtracted out
+        if self.connect_start is None or self.connect_end is None:
+            return None
+        return self.connect_end - self.connect_start - (self.dns or 0)
+
+    @property
+    def ttfb(self):
+        if self.response_start is None:
+            return None
+        return self.response_start - (self.connect_end or self.start)
+
+    @property
+    def body(self):
+        if self.response_start is None or self.last_chunk is None:
+            return None
+        return self.last_chunk - self.response_start
+
+    @property
+    def total(self):
+        end = self.last_chunk or self.response_start or self.end
+        if end is None:
+            return 0.0
+        return end - self.start
+
+
+class StrategyTrace:
+    """Everything recorded while one fetch strategy ran."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.requests = []
+        self.images = []
+        self.error = None
+        self.elapsed = 0.0
+
+    @property
+    def parse_time(self):
+        # Requests within a strategy run one after another, so whatever is
+        # left over is time spent outside the network: parsing and regexes.
+        return max(0.0, self.elapsed - sum(r.total for r in self.requests))
+
+
+def make_trace_config(trace: StrategyTrace):
+    """Build a TraceConfig that appends a RequestTiming per request to trace."""
+    config = aiohttp.TraceConfig()
+
+    async def on_request_start(session, ctx, params):
+        ctx.timing = RequestTiming(params.method, params.url)
+        trace.requests.append(ctx.timing)
+
+    async def on_dns_resolvehost_start(session, ctx, params):
+        ctx.timing.dns_start = time.perf_counter()
+
+    async def on_dns_resolvehost_end(session, ctx, params):
+        ctx.timing.dns_end = time.perf_counter()
+
+    async def on_connection_create_start(session, ctx, params):
+        ctx.timing.connect_start = time.perf_counter()
+
+    async def on_connection_create_end(session, ctx, params):
+        ctx.timing.connect_end = time.perf_counter()
+
+    async def on_request_end(session, ctx, params):
+        ctx.timing.response_start = time.perf_counter()
+        ctx.timing.status = params.response.status
+
+    async def on_request_redirect(session, ctx, params):
+        # Close this hop and time the next one as its own request
+        now = time.perf_counter()
+        ctx.timing.response_start = now
+        ctx.timing.status = params.response.status
+        method = "GET" if params.response.status == 303 else params.method
+        location = params.response.headers.get("Location", "")
+        ctx.timing = RequestTiming(method, params.url.join(URL(location)))
+        ctx.timing.start = now
+        trace.requests.append(ctx.timing)
+
+    async def on_response_chunk_received(session, ctx, params):
+        ctx.timing.last_chunk = time.perf_counter()
+        ctx.timing.bytes += len(params.chunk)
+
+    async def on_request_exception(session, ctx, params):
+        ctx.timing.end = time.perf_counter()
+        ctx.timing.error = type(params.exception).__name__
+
+    config.on_request_start.append(on_request_start)
+    config.on_dns_resolvehost_start.append(on_dns_resolvehost_start)
+    config.on_dns_resolvehost_end.append(on_dns_resolvehost_end)
+    config.on_connection_create_start.append(on_connection_create_start)
+    config.on_connection_create_end.append(on_connection_create_end)
+    config.on_request_end.append(on_request_end)
+    config.on_request_redirect.append(on_request_redirect)
+    config.on_response_chunk_received.append(on_response_chunk_received)
+    config.on_request_exception.append(on_request_exception)
+    config.freeze()
+    return config
+
+
+def trace_configs():
+    """TraceConfigs for a new session, empty outside of a traced strategy."""
+    trace = current_trace.get()
+    if trace is None:
+        return []
+    return [make_trace_config(trace)]
+
+
+async def run_traced(name: str, method_func, *args):
+    """Run a fetch strategy with tracing enabled and return its StrategyTrace."""
+    trace = StrategyTrace(name)
+    current_trace.set(trace)
+    start = time.perf_counter()
+    try:
+        trace.images = await method_func(*args) or []
+    except Exception as e:
+        trace.error = str(e)
+    trace.elapsed = time.perf_counter() - start
+    return trace
+
+
+async def run_all_traced(methods, *args):
+    """Run every (name, func) strategy concurrently, each in its own task."""
+    return await asyncio.gather(*(run_traced(name, func, *args) for name, func in methods))
+
+
+def _ms(seconds):
+    return "-" if seconds is None else f"{seconds * 1000:.0f}ms"
+
+
+def _size(num_bytes):
+    if num_bytes >= 1024:
+        return f"{num_bytes / 1024:.1f}KB"
+    return f"{num_bytes}B"
+
+
+def format_trace(trace: StrategyTrace):
+    """Return (name, value) for an embed field describing trace."""
+    if trace.images:
+        name = f"✅ {trace.name}: {len(trace.images)} images"
+    else:
+        name = f"❌ {trace.name}: no images"
+
+    lines = []
+    for r in trace.requests:
+        outcome = r.error or (str(r.status) if r.status is not None else "?")
+        lines.append(
+            f"`{r.method} {r.host}` **{outcome}** {_size(r.bytes)} · "
+            f"dns {_ms(r.dns)} · conn {_ms(r.connect)} · "
+            f"ttfb {_ms(r.ttfb)} · body {_ms(r.body)}"
+        )
+    if not trace.requests:
+        lines.append("No requests made")
+    lines.append(f"parse {_ms(trace.parse_time)} · total {_ms(trace.elapsed)}")
+    if trace.error:
+        lines.append(f"Error: {trace.error}")
+    if trace.images:
+        lines.append(f"Sample: {trace.images[0][:50]}...")
+
+    value = "\n".join(lines)
+    if len(value) > 1024:
+        value = value[:1021] + "..."
+    return name, value